@@ -1,6 +1,9 @@
 #!/bin/bash
 
-python manage.py migrate
+# The API-only settings profile has no database to migrate.
+if [ "$DJANGO_SETTINGS_MODULE" != "user_templates_api.settings_api" ]; then
+    python manage.py migrate
+fi
 
 nginx -g 'daemon off;' &
 
@@ -0,0 +1,317 @@
+"""
+Load test the API with a mix of catalog reads and multi-uuid renders, and
+report the throughput and latency percentiles of each kind of request.
+
+To test offline, set SIMULATION in the config of the server (see
+user_templates_api/simulation.py), so that auth and the upstream services
+are simulated. Then either point --url at a running server, or let --spawn
+start one with the same settings, after the simulated upstream services
+shared by its workers. Run from the root of the repository:
+
+    python src/benchmarks/load_test.py --spawn 4 --concurrency 32 --duration 30
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = (
+    SRC_DIR / "user_templates_api" / "templates" / "jupyter_lab" / "templates"
+)
+
+# Relative weights of the kinds of requests, roughly as seen from the portal,
+# which lists the templates once per workspace launch and renders a few.
+MIX = {
+    "list": 30,
+    "list_fields": 20,
+    "get": 15,
+    "search": 10,
+    "render": 20,
+    "render_hubmap_ids": 5,
+}
+
+
+def get_template_names():
+    return sorted(
+        template_dir.name
+        for template_dir in TEMPLATES_DIR.iterdir()
+        if (template_dir / "template.ipynb").is_file()
+    )
+
+
+class Workload:
+    """
+    Makes requests drawn from MIX. Renders use between 1 and max_uuids uuids
+    out of a pool, so that some of them repeat like they do in practice.
+    """
+
+    def __init__(self, url, max_uuids, uuid_pool_size, seed):
+        self.url = url.rstrip("/")
+        self.max_uuids = max_uuids
+        self.random = random.Random(seed)
+        self.template_names = get_template_names()
+        self.uuids = [
+            f"{self.random.getrandbits(128):032x}" for _ in range(uuid_pool_size)
+        ]
+        self.hubmap_ids = [
+            f"HBM{self.random.randrange(1000):03}."
+            + "".join(self.random.choices("BCDFGHJKLMNPQRSTVWXZ", k=4))
+            + f".{self.random.randrange(1000):03}"
+            for _ in range(uuid_pool_size)
+        ]
+        self.kinds = list(MIX)
+        self.weights = list(MIX.values())
+
+    def next_request(self):
+        """
+        Return the kind, method, path and JSON body of a random request.
+        """
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        template_name = self.random.choice(self.template_names)
+        if kind == "list":
+            return kind, "GET", "/templates/jupyter_lab/", None
+        if kind == "list_fields":
+            return (
+                kind,
+                "GET",
+                "/templates/jupyter_lab/?fields=title,description,tags&limit=10",
+                None,
+            )
+        if kind == "get":
+            return kind, "GET", f"/templates/jupyter_lab/{template_name}/", None
+        if kind == "search":
+            query = self.random.choice(["anndata", "visualization", "spatial", "api"])
+            return kind, "GET", f"/search/jupyter_lab/?q={query}", None
+
+        pool = self.hubmap_ids if kind == "render_hubmap_ids" else self.uuids
+        uuids = self.random.sample(pool, self.random.randint(1, self.max_uuids))
+        return (
+            kind,
+            "POST",
+            f"/templates/jupyter_lab/{template_name}/",
+            {"uuids": uuids},
+        )
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, kind, status, latency):
+        with self.lock:
+            self.latencies[kind].append(latency)
+            self.statuses[kind][status] += 1
+
+    def report(self, elapsed):
+        print(
+            f"{'request':<20}{'count':>8}{'req/s':>9}{'p50':>9}{'p90':>9}"
+            f"{'p99':>9}{'max':>9}  statuses"
+        )
+        all_latencies = []
+        for kind in list(MIX) + ["total"]:
+            if kind == "total":
+                latencies = all_latencies
+                statuses = defaultdict(int)
+                for kind_statuses in self.statuses.values():
+                    for status, count in kind_statuses.items():
+                        statuses[status] += count
+            else:
+                latencies = self.latencies.get(kind, [])
+                statuses = self.statuses.get(kind, {})
+                all_latencies.extend(latencies)
+            if not latencies:
+                continue
+            latencies = sorted(latencies)
+            print(
+                f"{kind:<20}{len(latencies):>8}{len(latencies) / elapsed:>9.1f}"
+                + "".join(
+                    f"{percentile(latencies, q) * 1e3:>7.1f}ms"
+                    for q in (0.5, 0.9, 0.99, 1)
+                )
+                + "  "
+                + " ".join(
+                    f"{status}:{count}" for status, count in sorted(statuses.items())
+                )
+            )
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_worker(workload, results, deadline, remaining, token):
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    while time.perf_counter() < deadline:
+        with remaining["lock"]:
+            if remaining["count"] == 0:
+                return
+            remaining["count"] -= 1
+            kind, method, path, body = workload.next_request()
+
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, workload.url + path, json=body, timeout=60
+            )
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        results.add(kind, status, time.perf_counter() - start)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_upstreams():
+    """
+    Start the simulated upstream services shared by the workers, and return
+    the process, or None if SIMULATION is not set in the config.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "user_templates_api.simulation"],
+        cwd=SRC_DIR,
+        env=os.environ,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    # The server prints its URL once it is listening.
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        print("SIMULATION is not set, using the upstream services in the config")
+        return None
+    print(line.strip())
+    return process
+
+
+def spawn_server(workers):
+    """
+    Start the API with gunicorn as in production, or with the development
+    server if gunicorn is not installed, and return the process and its URL.
+    """
+    port = get_free_port()
+    if shutil.which("gunicorn"):
+        command = [
+            "gunicorn",
+            f"--bind=127.0.0.1:{port}",
+            f"--workers={workers}",
+            "user_templates_api.wsgi:application",
+        ]
+    else:
+        print("gunicorn is not installed, using the development server")
+        command = [
+            sys.executable,
+            "manage.py",
+            "runserver",
+            "--noreload",
+            f"127.0.0.1:{port}",
+        ]
+    process = subprocess.Popen(
+        command,
+        cwd=SRC_DIR,
+        env=os.environ,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    for _ in range(300):
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            requests.get(f"{url}/status/", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def stop_processes(processes):
+    for process in reversed(processes):
+        process.terminate()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--spawn",
+        type=int,
+        metavar="WORKERS",
+        help="start a server with this many workers instead of using --url",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--max-uuids", type=int, default=20)
+    parser.add_argument("--uuid-pool-size", type=int, default=200)
+    parser.add_argument("--token", default="simulated-token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print raw latencies")
+    args = parser.parse_args(argv)
+
+    processes = []
+    url = args.url
+    if args.spawn:
+        upstreams_process = spawn_upstreams()
+        if upstreams_process is not None:
+            processes.append(upstreams_process)
+        try:
+            process, url = spawn_server(args.spawn)
+        except RuntimeError:
+            stop_processes(processes)
+            raise
+        processes.append(process)
+
+    try:
+        workload = Workload(url, args.max_uuids, args.uuid_pool_size, args.seed)
+        results = Results()
+        remaining = {
+            "lock": threading.Lock(),
+            "count": -1 if args.requests is None else args.requests,
+        }
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=run_worker,
+                args=(workload, results, start + args.duration, remaining, args.token),
+            )
+            for _ in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        stop_processes(processes)
+
+    if args.json:
+        print(json.dumps({"elapsed": elapsed, "latencies": results.latencies}))
+    else:
+        results.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
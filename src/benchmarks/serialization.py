@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of encoding the render response envelope with each available
+JSON backend, using the largest jinja templates with a list of uuids filled in.
+
+Run from the root of the repository:
+
+    python src/benchmarks/serialization.py
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from user_templates_api import serialization  # noqa: E402
+
+TEMPLATES_DIR = (
+    Path(__file__).resolve().parent.parent
+    / "user_templates_api"
+    / "templates"
+    / "jupyter_lab"
+    / "templates"
+)
+
+
+def get_largest_notebooks(count, uuid_count):
+    template_file_paths = sorted(
+        TEMPLATES_DIR.glob("*/template.ipynb"),
+        key=lambda path: path.stat().st_size,
+        reverse=True,
+    )[:count]
+    uuids = repr([f"{i:032x}" for i in range(uuid_count)])
+
+    notebooks = {}
+    for template_file_path in template_file_paths:
+        text = template_file_path.read_text().replace("{{ uuids | safe }}", uuids)
+        notebook = serialization.create_backend("json").loads(text)
+        notebooks[template_file_path.parent.name] = {
+            "cells": notebook["cells"],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        }
+    return notebooks
+
+
+def encode_envelope(backend, notebook):
+    # Mirrors JupyterLabRender.render followed by TemplateView.post.
+    rendered_template = backend.dumps(notebook).decode()
+    return backend.dumps(
+        {
+            "success": True,
+            "message": "Successful template render",
+            "data": {"template": rendered_template},
+        }
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--templates", type=int, default=3)
+    parser.add_argument("--uuids", type=int, default=100)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    notebooks = get_largest_notebooks(args.templates, args.uuids)
+    backends = serialization.get_available_backends()
+
+    print(f"{'template':<28}{'bytes':>8}" + "".join(f"{n:>12}" for n in backends))
+    for template_name, notebook in notebooks.items():
+        size = len(encode_envelope(serialization.StdlibBackend(), notebook))
+        timings = []
+        for backend_class in backends.values():
+            backend = backend_class()
+            seconds = min(
+                timeit.repeat(
+                    lambda: encode_envelope(backend, notebook),
+                    number=args.number,
+                    repeat=3,
+                )
+            )
+            timings.append(seconds / args.number * 1e6)
+        print(
+            f"{template_name:<28}{size:>8}"
+            + "".join(f"{timing:>10.1f}us" for timing in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
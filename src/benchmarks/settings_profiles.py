@@ -0,0 +1,101 @@
+"""
+Compare the startup time and per-request overhead of the default settings and
+the API-only settings profile.
+
+Each profile is measured in a fresh interpreter, so the config.json used by
+the server has to be in place. Run from the root of the repository:
+
+    python src/benchmarks/settings_profiles.py
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import timeit
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ["user_templates_api.settings", "user_templates_api.settings_api"]
+PATHS = ["/status/", "/templates/jupyter_lab/?fields=title"]
+
+
+def measure(requests):
+    """
+    Measure the current settings profile, run in a child interpreter.
+    """
+    start = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    startup = time.perf_counter() - start
+
+    from django.conf import settings
+
+    settings.ALLOWED_HOSTS = ["testserver"]
+
+    def request(path):
+        path, _, query_string = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": query_string,
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "testserver",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        response = application(environ, lambda status, headers: None)
+        b"".join(response)
+        response.close()
+
+    results = {"startup_ms": startup * 1e3, "modules": len(sys.modules)}
+    for path in PATHS:
+        seconds = min(timeit.repeat(lambda: request(path), number=requests, repeat=5))
+        results[path] = seconds / requests * 1e6
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.path.insert(0, str(SRC_DIR))
+        os.environ["DJANGO_SETTINGS_MODULE"] = args.child
+        print(json.dumps(measure(args.requests)))
+        return
+
+    print(
+        f"{'profile':<34}{'startup':>10}{'modules':>9}"
+        + "".join(f"{path:>40}" for path in PATHS)
+    )
+    for profile in PROFILES:
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                profile,
+                "--requests",
+                str(args.requests),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{profile:<34}{results['startup_ms']:>8.0f}ms{results['modules']:>9}"
+            + "".join(f"{results[path]:>38.1f}us" for path in PATHS)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,35 @@ from hubmap_commons.hm_auth import AuthHelper
 class UserTemplatesApiConfig(AppConfig):
     name = "user_templates_api"
     auth_helper = None
+    catalog = None
+    search_index = None
 
     def ready(self):
+        from user_templates_api import serialization
+        from user_templates_api.catalog import TemplateCatalog
+        from user_templates_api.search import TemplateSearchIndex
+        from user_templates_api.template_watcher import TemplateWatcher
+
+        serialization.set_backend(settings.CONFIG.get("JSON_BACKEND", "auto"))
+
         client_id = settings.CONFIG["GLOBUS_CLIENT_ID"]
         client_secret = settings.CONFIG["GLOBUS_CLIENT_SECRET"]
-        if not AuthHelper.isInitialized():
+        if settings.CONFIG.get("SIMULATION"):
+            from user_templates_api.simulation import setup_simulation
+
+            self.auth_helper = setup_simulation(settings.CONFIG)
+        elif not AuthHelper.isInitialized():
             self.auth_helper = AuthHelper.create(
                 clientId=client_id, clientSecret=client_secret
             )
         else:
             self.auth_helper = AuthHelper.instance()
+
+        self.catalog = TemplateCatalog(
+            settings.BASE_DIR / "user_templates_api" / "templates"
+        )
+        self.search_index = TemplateSearchIndex()
+        self.catalog.add_listener(self.search_index.update)
+        self.catalog.load()
+        if settings.CONFIG.get("TEMPLATE_HOT_RELOAD", False):
+            TemplateWatcher(self.catalog).start()
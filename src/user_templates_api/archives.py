@@ -0,0 +1,99 @@
+"""
+Archives written member by member to a generator of byte chunks, for
+streaming responses. Only the member being added is held in memory.
+"""
+
+import io
+import tarfile
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkBuffer(io.RawIOBase):
+    """
+    Unseekable file that keeps what is written to it until it is drained.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ZipArchiveWriter:
+    content_type = "application/zip"
+    extension = "zip"
+
+    def __init__(self):
+        self.buffer = ChunkBuffer()
+        # zipfile writes data descriptors instead of seeking back to sizes.
+        self.archive = zipfile.ZipFile(self.buffer, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name, chunks, mtime):
+        info = zipfile.ZipInfo(name, date_time=time.localtime(mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.archive.open(info, "w") as member:
+            for chunk in chunks:
+                member.write(chunk)
+                yield self.buffer.drain()
+        yield self.buffer.drain()
+
+    def close(self):
+        self.archive.close()
+        yield self.buffer.drain()
+
+
+class TarArchiveWriter:
+    content_type = "application/gzip"
+    extension = "tar.gz"
+
+    def __init__(self):
+        self.buffer = ChunkBuffer()
+        self.archive = tarfile.open(fileobj=self.buffer, mode="w|gz")
+
+    def add(self, name, chunks, mtime):
+        # Tar headers hold the size of the member, so the member is read first.
+        data = b"".join(chunks)
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = mtime
+        self.archive.addfile(info, io.BytesIO(data))
+        yield self.buffer.drain()
+
+    def close(self):
+        self.archive.close()
+        yield self.buffer.drain()
+
+
+ARCHIVE_WRITERS = {"zip": ZipArchiveWriter, "tar.gz": TarArchiveWriter}
+
+
+def read_chunks(path):
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+def stream_archive(archive_format, members):
+    """
+    Yield the archive in the given format of members, an iterable of
+    (name, content) pairs, where content is bytes or the Path of a file.
+    """
+    writer = ARCHIVE_WRITERS[archive_format]()
+    mtime = int(time.time())
+    for name, content in members:
+        chunks = [content] if isinstance(content, bytes) else read_chunks(content)
+        yield from (chunk for chunk in writer.add(name, chunks, mtime) if chunk)
+    yield from (chunk for chunk in writer.close() if chunk)
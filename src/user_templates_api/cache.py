@@ -0,0 +1,55 @@
+"""
+Cache for render results and upstream lookups, shared by the workers if the
+"user_templates" cache in settings.CACHES uses a shared backend.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from user_templates_api.serialization import dumps
+
+CACHE_ALIAS = "user_templates"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def make_key(namespace, *parts):
+    """
+    Key for the JSON serializable parts. The parts are hashed, so keys have a
+    fixed length and tokens never appear in them.
+    """
+    return f"{namespace}:{hashlib.sha256(dumps(parts).encode()).hexdigest()}"
+
+
+def get_config_digest():
+    """
+    Digest of the upstream URLs in the config, which rendered cells embed.
+    """
+    return hashlib.sha256(
+        dumps(
+            {
+                name: value
+                for name, value in settings.CONFIG.items()
+                if name.endswith(("_BASE", "_ENDPOINT", "_PATH"))
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest() if token else None
+
+
+def get_or_compute(namespace, parts, compute):
+    cache = get_cache()
+    key = make_key(namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
@@ -0,0 +1,206 @@
+"""
+Cache backends that bound the total size of the cached values, evicting the
+least recently used entries first.
+
+SizeLimitedFileBasedCache is shared by every worker on a host, and can be
+kept in memory by pointing its LOCATION at /dev/shm. SizeLimitedLocMemCache
+is a per-process stand-in for memcached or redis in development and tests.
+Both take the maximum size in bytes as OPTIONS["MAX_SIZE"], and only limit
+the number of entries if OPTIONS["MAX_ENTRIES"] is set.
+"""
+
+import os
+import sys
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Number of writes after which a worker scans the cache directory again, to
+# count what the other workers wrote.
+RESCAN_INTERVAL = 100
+
+_size_accounts = {}
+
+
+def get_max_entries(params):
+    # Django caps caches at 300 entries by default and culls them at random.
+    # These caches are bounded by size instead, unless MAX_ENTRIES is set.
+    return int(params.get("OPTIONS", {}).get("MAX_ENTRIES", sys.maxsize))
+
+
+class SizeLimitedFileBasedCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._max_size = int(
+            params.get("OPTIONS", {}).get("MAX_SIZE", DEFAULT_MAX_SIZE)
+        )
+        self._max_entries = get_max_entries(params)
+        # Running total of the size of the cache files, counted by a scan of
+        # the directory and the writes and deletes of this worker since.
+        self._size = None
+        self._writes_since_scan = 0
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        if value is not default:
+            # The expiry is stored in the file itself, so the modification time
+            # is free to track when an entry was last used.
+            try:
+                os.utime(self._key_to_file(key, version))
+            except OSError:
+                pass
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version)
+        if self._size is not None:
+            try:
+                self._size += os.path.getsize(self._key_to_file(key, version))
+            except OSError:
+                pass
+            self._writes_since_scan += 1
+
+    def _delete(self, fname):
+        try:
+            size = os.path.getsize(fname)
+        except OSError:
+            size = 0
+        deleted = super()._delete(fname)
+        if deleted and self._size is not None:
+            self._size -= size
+        return deleted
+
+    def _cull(self):
+        if self._max_entries != sys.maxsize:
+            super()._cull()
+
+        if (
+            self._size is not None
+            and self._size <= self._max_size
+            and self._writes_since_scan < RESCAN_INTERVAL
+        ):
+            return
+
+        entries = []
+        for fname in self._list_cache_files():
+            try:
+                stat = os.stat(fname)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fname))
+
+        self._size = None
+        total_size = sum(size for _, size, _ in entries)
+        if total_size > self._max_size:
+            # Make room for more than one entry, so that a full cache is not
+            # culled again on every set.
+            target_size = self._max_size - self._max_size // (self._cull_frequency or 1)
+            for _, size, fname in sorted(entries):
+                if total_size <= target_size:
+                    break
+                if self._delete(fname):
+                    total_size -= size
+        self._size = total_size
+        self._writes_since_scan = 0
+
+    def clear(self):
+        super().clear()
+        self._size = None
+
+    def get_size(self):
+        size = 0
+        for fname in self._list_cache_files():
+            try:
+                size += os.path.getsize(fname)
+            except FileNotFoundError:
+                pass
+        return size
+
+
+class SizeAccount:
+    """
+    Sizes of the entries of a SizeLimitedLocMemCache, shared by its instances
+    in every thread like the entries themselves.
+    """
+
+    def __init__(self):
+        self.sizes = {}
+        self.total = 0
+
+    def add(self, key, size):
+        self.discard(key)
+        self.sizes[key] = size
+        self.total += size
+
+    def discard(self, key):
+        self.total -= self.sizes.pop(key, 0)
+
+    def clear(self):
+        self.sizes.clear()
+        self.total = 0
+
+
+class SizeLimitedLocMemCache(LocMemCache):
+    # LocMemCache only calls _set, _cull and _delete with self._lock held.
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_size = int(
+            params.get("OPTIONS", {}).get("MAX_SIZE", DEFAULT_MAX_SIZE)
+        )
+        self._max_entries = get_max_entries(params)
+        self._account = _size_accounts.setdefault(name, SizeAccount())
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        super()._set(key, value, timeout)
+        self._account.add(key, len(value))
+        self._evict()
+
+    def _evict(self):
+        # Entries are kept most recently used first, so evict from the end.
+        while self._account.total > self._max_size and len(self._cache) > 1:
+            evicted_key, _ = self._cache.popitem()
+            self._expire_info.pop(evicted_key, None)
+            self._account.discard(evicted_key)
+
+    def incr(self, key, delta=1, version=None):
+        # LocMemCache.incr replaces the value without going through _set.
+        new_value = super().incr(key, delta, version)
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if key in self._cache:
+                self._account.add(key, len(self._cache[key]))
+                self._evict()
+        return new_value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        # LocMemCache.touch does not mark the entry as used, so it would be
+        # evicted before entries that were used less recently.
+        touched = super().touch(key, timeout, version)
+        if touched:
+            key = self.make_and_validate_key(key, version=version)
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key, last=False)
+        return touched
+
+    def _cull(self):
+        super()._cull()
+        for key in set(self._account.sizes) - self._cache.keys():
+            self._account.discard(key)
+
+    def _delete(self, key):
+        self._account.discard(key)
+        return super()._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_info.clear()
+            self._account.clear()
+
+    def get_size(self):
+        return self._account.total
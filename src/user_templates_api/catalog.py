@@ -0,0 +1,265 @@
+import base64
+import binascii
+import logging
+
+from user_templates_api.serialization import DecodeError, dumps, load, loads
+from user_templates_api.templates.jupyter_lab.compiled_templates import (
+    invalidate_compiled_templates,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields templates can be sorted by, with the value used when a template lacks it.
+SORT_FIELDS = {"name": "", "title": "", "last_modified_unix_timestamp": 0}
+
+# Number of projections of the templates whose serializations are kept.
+MAX_SERIALIZED_PROJECTIONS = 64
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class TemplateCatalog:
+    """
+    In-memory copy of the metadata of every template, with an index from tags to
+    template names and the JSON serializations of the templates per projection.
+
+    Updates build new dictionaries and swap them in with a single assignment,
+    so readers always see a complete catalog without taking a lock.
+    """
+
+    def __init__(self, templates_dir):
+        self.templates_dir = templates_dir
+        self.snapshot = ({}, {}, {})
+        self.listeners = []
+
+    @property
+    def templates(self):
+        return self.snapshot[0]
+
+    @property
+    def tags(self):
+        return self.snapshot[1]
+
+    def get_template_type_dir(self, template_type):
+        return self.templates_dir / template_type / "templates"
+
+    def get_template_types(self):
+        return [
+            template_type_dir.name
+            for template_type_dir in self.templates_dir.iterdir()
+            if (template_type_dir / "templates").is_dir()
+        ]
+
+    def load(self):
+        templates = {}
+        for template_type in self.get_template_types():
+            templates[template_type] = {}
+            for template_dir in self.get_template_type_dir(template_type).iterdir():
+                metadata = self.load_metadata(template_dir)
+                if metadata is not None:
+                    templates[template_type][template_dir.name] = metadata
+
+        self.swap(templates)
+
+    def load_metadata(self, template_dir):
+        if not template_dir.is_dir() or "__" in template_dir.name:
+            return None
+        try:
+            with open(template_dir / "metadata.json", "rb") as metadata_file:
+                return load(metadata_file)
+        except (OSError, DecodeError) as e:
+            logger.warning(f"Skipping template {template_dir.name}: {e!r}")
+            return None
+
+    def reload_template(self, template_type, template_name):
+        """
+        Re-read a single template directory, adding, updating or removing it.
+        """
+        template_dir = self.get_template_type_dir(template_type) / template_name
+        metadata = self.load_metadata(template_dir)
+
+        templates = dict(self.templates)
+        templates[template_type] = dict(templates.get(template_type, {}))
+        if metadata is None:
+            templates[template_type].pop(template_name, None)
+        else:
+            templates[template_type][template_name] = metadata
+
+        invalidate_compiled_templates(template_dir)
+        self.swap(templates, changed=[(template_type, template_name)])
+
+    def swap(self, templates, changed=None):
+        if changed is None:
+            tags = {}
+            serialized = {}
+            changed_types = templates.keys()
+        else:
+            tags = dict(self.tags)
+            changed_types = {template_type for template_type, _ in changed}
+            # Keep the serializations of the template types that did not change.
+            serialized = {
+                key: value
+                for key, value in self.snapshot[2].items()
+                if key[0] not in changed_types
+            }
+
+        for template_type in changed_types:
+            tags[template_type] = self.build_tag_index(templates.get(template_type, {}))
+        self.snapshot = (templates, tags, serialized)
+
+        for listener in self.listeners:
+            listener(self, changed)
+
+    @staticmethod
+    def build_tag_index(type_templates):
+        tag_index = {}
+        for template_name, metadata in type_templates.items():
+            for tag in metadata.get("tags", []):
+                tag_index.setdefault(tag, set()).add(template_name)
+        return tag_index
+
+    def add_listener(self, listener):
+        """
+        Register a function called as listener(catalog, changed) after every
+        update. changed is a list of (template_type, template_name) pairs, or
+        None when the whole catalog was loaded.
+        """
+        self.listeners.append(listener)
+
+    def get_templates(self, template_type, tags=None, snapshot=None):
+        templates, tag_indexes, _ = snapshot or self.snapshot
+        type_templates = templates.get(template_type, {})
+        if not tags:
+            return type_templates
+
+        tag_index = tag_indexes.get(template_type, {})
+        template_names = set().union(*(tag_index.get(tag, set()) for tag in tags))
+        return {
+            template_name: metadata
+            for template_name, metadata in type_templates.items()
+            if template_name in template_names
+        }
+
+    def get_metadata(self, template_type, template_name):
+        return self.templates.get(template_type, {}).get(template_name)
+
+    def get_field_names(self, template_type):
+        return set().union(
+            *(
+                metadata.keys()
+                for metadata in self.templates.get(template_type, {}).values()
+            )
+        )
+
+    def get_serialized_templates(self, template_type, fields=None, snapshot=None):
+        """
+        Return a dict from template name to the JSON serialization of its
+        metadata, limited to fields if given. Serializations are computed once
+        per projection of a known template type, and kept until a template of
+        that type changes or MAX_SERIALIZED_PROJECTIONS newer projections are
+        cached.
+
+        snapshot is the catalog snapshot to read, so that callers reading it
+        more than once see the same templates.
+        """
+        templates, _, serialized = snapshot or self.snapshot
+        if template_type not in templates:
+            return {}
+        key = (template_type, fields)
+        type_serialized = serialized.get(key)
+        if type_serialized is None:
+            type_serialized = {
+                template_name: dumps(
+                    metadata
+                    if fields is None
+                    else {
+                        field: metadata[field] for field in fields if field in metadata
+                    }
+                )
+                for template_name, metadata in templates[template_type].items()
+            }
+            # Evict the oldest projections. Another thread may be evicting too.
+            while len(serialized) >= MAX_SERIALIZED_PROJECTIONS:
+                try:
+                    serialized.pop(next(iter(serialized)), None)
+                except (StopIteration, RuntimeError):
+                    break
+            serialized[key] = type_serialized
+        return type_serialized
+
+    def list_templates(
+        self,
+        template_type,
+        tags=None,
+        fields=None,
+        sort="name",
+        limit=None,
+        cursor=None,
+    ):
+        """
+        Return the serialized templates of a page of the listing, and the cursor
+        for the next page, or None if this is the last page.
+
+        sort is one of SORT_FIELDS, prefixed with - to sort in descending order.
+        """
+        descending = sort.startswith("-")
+        sort_field = sort.lstrip("-")
+        default = SORT_FIELDS[sort_field]
+        snapshot = self.snapshot
+        templates = self.get_templates(template_type, tags, snapshot)
+        serialized = self.get_serialized_templates(template_type, fields, snapshot)
+
+        def sort_key(template_name):
+            if sort_field == "name":
+                return [template_name, template_name]
+            return [templates[template_name].get(sort_field, default), template_name]
+
+        template_names = sorted(templates, key=sort_key, reverse=descending)
+        if cursor is not None:
+            cursor_key = self.decode_cursor(cursor, sort)
+            try:
+                template_names = [
+                    template_name
+                    for template_name in template_names
+                    if (
+                        sort_key(template_name) < cursor_key
+                        if descending
+                        else sort_key(template_name) > cursor_key
+                    )
+                ]
+            except TypeError:
+                # The sort field holds values of another type than in the cursor.
+                raise InvalidCursorError("Cursor does not match sort")
+
+        next_cursor = None
+        if limit is not None and len(template_names) > limit:
+            template_names = template_names[:limit]
+            next_cursor = self.encode_cursor(sort, sort_key(template_names[-1]))
+
+        return {
+            template_name: serialized[template_name] for template_name in template_names
+        }, next_cursor
+
+    @staticmethod
+    def encode_cursor(sort, sort_key):
+        """
+        Encode the sort key of the last template of a page, with the sort it
+        was taken from, so that the cursor cannot be used with another sort.
+        """
+        payload = dumps([sort, *sort_key])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor, sort):
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            payload = loads(base64.urlsafe_b64decode(cursor + padding))
+        except (binascii.Error, DecodeError):
+            raise InvalidCursorError("Invalid cursor")
+        if not isinstance(payload, list) or len(payload) != 3:
+            raise InvalidCursorError("Invalid cursor")
+        if payload[0] != sort:
+            raise InvalidCursorError("Cursor does not match sort")
+        return payload[1:]
@@ -0,0 +1,180 @@
+import re
+
+from django.conf import settings
+
+from user_templates_api.catalog import SORT_FIELDS
+from user_templates_api.serialization import DecodeError, loads
+
+# Defaults used when config.json does not set MAX_REQUEST_BODY_BYTES/MAX_UUIDS.
+DEFAULT_MAX_REQUEST_BODY_BYTES = 1024 * 1024
+DEFAULT_MAX_UUIDS = 1000
+MAX_LISTING_LIMIT = 1000
+
+# Keys that are set by the API itself and cannot be overridden by the request body.
+RESERVED_KEYS = {"group_token", "metadata"}
+
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{32}")
+HUBMAP_ID_PATTERN = re.compile(r"HBM[0-9]{3}\.[A-Z]{4}\.[0-9]{3}", re.IGNORECASE)
+
+
+class RequestParseError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def get_max_body_size():
+    return settings.CONFIG.get("MAX_REQUEST_BODY_BYTES", DEFAULT_MAX_REQUEST_BODY_BYTES)
+
+
+def get_max_uuids(metadata):
+    return metadata.get(
+        "max_uuids", settings.CONFIG.get("MAX_UUIDS", DEFAULT_MAX_UUIDS)
+    )
+
+
+def is_valid_uuid(uuid):
+    """
+    >>> is_valid_uuid('69c70762689b20308bb049ac49653342')
+    True
+    >>> is_valid_uuid('69c70762-689b-2030-8bb0-49ac49653342')
+    False
+    """
+    return (
+        isinstance(uuid, str)
+        and len(uuid) == 32
+        and UUID_PATTERN.fullmatch(uuid) is not None
+    )
+
+
+def is_hubmap_id(uuid):
+    """
+    >>> is_hubmap_id('HBM622.JXWQ.554')
+    True
+    >>> is_hubmap_id('69c70762689b20308bb049ac49653342')
+    False
+    """
+    return (
+        isinstance(uuid, str)
+        and len(uuid) == 15
+        and HUBMAP_ID_PATTERN.fullmatch(uuid) is not None
+    )
+
+
+def read_body(request, max_size):
+    """
+    Read at most max_size bytes of the request body. Requests that announce a
+    larger body are rejected before anything is read.
+    """
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        raise RequestParseError("Invalid Content-Length header")
+
+    if content_length > max_size:
+        raise RequestParseError(
+            f"Request body exceeds the maximum of {max_size} bytes", status=413
+        )
+
+    # The body may be sent without a Content-Length (chunked), so never read
+    # more than one byte past the limit regardless of what the header says.
+    body = request.read(max_size + 1)
+    if len(body) > max_size:
+        raise RequestParseError(
+            f"Request body exceeds the maximum of {max_size} bytes", status=413
+        )
+    return body
+
+
+def validate_uuids(uuids, max_uuids):
+    if not isinstance(uuids, list):
+        raise RequestParseError("uuids must be a list")
+    if len(uuids) > max_uuids:
+        raise RequestParseError(
+            f"Too many uuids, this template accepts at most {max_uuids}"
+        )
+    for uuid in uuids:
+        if not (is_valid_uuid(uuid) or is_hubmap_id(uuid)):
+            raise RequestParseError(f"Invalid uuid: {str(uuid)[:64]!r}")
+
+
+def parse_render_request(request, metadata):
+    """
+    Parse and validate the JSON body of a render request.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        the incoming request, whose body has not been read yet
+    metadata : dict
+        metadata of the template, which may set max_uuids
+
+    Return
+    ---------
+    dict
+        the parsed body, to be merged into the render data
+    """
+    body = read_body(request, get_max_body_size())
+    if not body.strip():
+        return {}
+
+    try:
+        data = loads(body)
+    except DecodeError:
+        raise RequestParseError("Request body is not valid JSON")
+
+    if not isinstance(data, dict):
+        raise RequestParseError("Request body must be a JSON object")
+
+    reserved_keys = RESERVED_KEYS & data.keys()
+    if reserved_keys:
+        raise RequestParseError(
+            f"Request body cannot set {', '.join(sorted(reserved_keys))}"
+        )
+
+    if "uuids" in data:
+        validate_uuids(data["uuids"], get_max_uuids(metadata))
+
+    return data
+
+
+def parse_listing_params(query, known_fields=None):
+    """
+    Parse the fields, sort, limit and cursor query parameters of a template
+    listing. fields may be repeated or comma separated, and fields that are
+    not in known_fields are dropped.
+    """
+    requested_fields = [
+        field
+        for fields_param in query.getlist("fields")
+        for field in fields_param.split(",")
+        if field
+    ]
+    fields = [
+        field
+        for field in requested_fields
+        if known_fields is None or field in known_fields
+    ]
+
+    sort = query.get("sort", "name")
+    if sort.lstrip("-") not in SORT_FIELDS:
+        raise RequestParseError(
+            f"sort must be one of {', '.join(SORT_FIELDS)}, optionally prefixed with -"
+        )
+
+    limit = query.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise RequestParseError("limit must be an integer")
+        if not 0 < limit <= MAX_LISTING_LIMIT:
+            raise RequestParseError(f"limit must be between 1 and {MAX_LISTING_LIMIT}")
+
+    return {
+        "fields": tuple(sorted(set(fields))) if requested_fields else None,
+        "sort": sort,
+        "limit": limit,
+        "cursor": query.get("cursor"),
+    }
@@ -0,0 +1,149 @@
+import math
+import re
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# fmt: off
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "how",
+    "in", "into", "is", "it", "of", "on", "or", "that", "the", "this", "to",
+    "use", "used", "uses", "using", "with",
+}
+# fmt: on
+
+# A term in the title counts as much as three terms in the README.
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "description": 1.5, "readme": 1.0}
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """
+    >>> tokenize('Visualize CODEX data with Vitessce')
+    ['visualize', 'codex', 'data', 'vitessce']
+    """
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class TypeIndex:
+    """
+    Inverted index over the templates of one template type. Instances are not
+    modified after they are built.
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.lengths = {
+            template_name: sum(term_frequencies.values())
+            for template_name, term_frequencies in documents.items()
+        }
+        self.average_length = (
+            sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0
+        )
+
+        self.postings = {}
+        for template_name, term_frequencies in documents.items():
+            for term, frequency in term_frequencies.items():
+                self.postings.setdefault(term, {})[template_name] = frequency
+
+    def search(self, query, limit):
+        document_count = len(self.documents)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term, {})
+            if not postings:
+                continue
+            idf = math.log(
+                1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for template_name, frequency in postings.items():
+                length_norm = (
+                    1 - B + B * self.lengths[template_name] / (self.average_length or 1)
+                )
+                scores[template_name] += (
+                    idf * frequency * (K1 + 1) / (frequency + K1 * length_norm)
+                )
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+class TemplateSearchIndex:
+    """
+    Full-text index over the title, description, tags and README of every
+    template that is not hidden, ranked with BM25.
+
+    Register update() as a catalog listener to keep the index in sync with the
+    catalog. Only the templates that changed are tokenized again.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+
+    @staticmethod
+    def index_template(catalog, template_type, template_name, metadata):
+        readme_path = (
+            catalog.get_template_type_dir(template_type) / template_name / "README.md"
+        )
+        try:
+            readme = readme_path.read_text()
+        except OSError:
+            readme = ""
+
+        fields = {
+            "title": metadata.get("title", ""),
+            "description": metadata.get("description", ""),
+            "tags": " ".join(metadata.get("tags", [])),
+            "readme": readme,
+        }
+        term_frequencies = Counter()
+        for field, text in fields.items():
+            for token in tokenize(text):
+                term_frequencies[token] += FIELD_WEIGHTS[field]
+        return term_frequencies
+
+    def update(self, catalog, changed):
+        if changed is None:
+            changed = [
+                (template_type, template_name)
+                for template_type, type_templates in catalog.templates.items()
+                for template_name in type_templates
+            ]
+            indexes = {}
+        else:
+            indexes = dict(self.indexes)
+
+        documents_by_type = {}
+        for template_type, template_name in changed:
+            if template_type not in documents_by_type:
+                type_index = indexes.get(template_type)
+                documents_by_type[template_type] = (
+                    dict(type_index.documents) if type_index else {}
+                )
+            documents = documents_by_type[template_type]
+
+            metadata = catalog.get_metadata(template_type, template_name)
+            if metadata is None or metadata.get("is_hidden", False):
+                documents.pop(template_name, None)
+            else:
+                documents[template_name] = self.index_template(
+                    catalog, template_type, template_name, metadata
+                )
+
+        for template_type, documents in documents_by_type.items():
+            indexes[template_type] = TypeIndex(documents)
+        self.indexes = indexes
+
+    def search(self, template_type, query, limit=20):
+        """
+        Return up to limit (template_name, score) pairs, best match first.
+        """
+        type_index = self.indexes.get(template_type)
+        if type_index is None:
+            return []
+        return type_index.search(query, limit)
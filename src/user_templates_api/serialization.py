@@ -0,0 +1,126 @@
+"""
+JSON encoding and decoding for the API.
+
+orjson or msgspec are used if installed, falling back to the standard library.
+The backend can be pinned with JSON_BACKEND in the config ("auto", "orjson",
+"msgspec" or "json").
+"""
+
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class StdlibBackend:
+    name = "json"
+    decode_errors = (ValueError,)
+
+    def dumps(self, obj, sort_keys=False):
+        return json.dumps(obj, sort_keys=sort_keys).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    name = "orjson"
+    decode_errors = (ValueError,)
+
+    def dumps(self, obj, sort_keys=False):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecBackend:
+    name = "msgspec"
+
+    def __init__(self):
+        self.encoder = msgspec.json.Encoder()
+        self.sorted_encoder = msgspec.json.Encoder(order="sorted")
+        self.decoder = msgspec.json.Decoder()
+        self.decode_errors = (ValueError, msgspec.DecodeError)
+
+    def dumps(self, obj, sort_keys=False):
+        return (self.sorted_encoder if sort_keys else self.encoder).encode(obj)
+
+    def loads(self, data):
+        return self.decoder.decode(data)
+
+
+def get_available_backends():
+    backends = {}
+    if orjson is not None:
+        backends["orjson"] = OrjsonBackend
+    if msgspec is not None:
+        backends["msgspec"] = MsgspecBackend
+    backends["json"] = StdlibBackend
+    return backends
+
+
+def create_backend(name="auto"):
+    backends = get_available_backends()
+    if name == "auto":
+        name = next(iter(backends))
+    if name not in backends:
+        raise ValueError(
+            f"JSON backend {name} is not available, use one of {', '.join(backends)}"
+        )
+    return backends[name]()
+
+
+backend = create_backend()
+
+
+class DecodeError(ValueError):
+    """
+    Raised by loads() for invalid JSON, whichever backend is in use.
+    """
+
+
+def set_backend(name):
+    global backend
+    backend = create_backend(name)
+
+
+def dumps_bytes(obj, sort_keys=False):
+    return backend.dumps(obj, sort_keys)
+
+
+def dumps(obj, sort_keys=False):
+    return backend.dumps(obj, sort_keys).decode()
+
+
+def loads(data):
+    try:
+        return backend.loads(data)
+    except backend.decode_errors as e:
+        raise DecodeError(str(e)) from e
+
+
+def load(file):
+    return loads(file.read())
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        backend.dumps(data), content_type="application/json", status=status
+    )
+
+
+def serialized_json_response(content, status=200):
+    """
+    Response for content that is already serialized as JSON.
+    """
+    return HttpResponse(content, content_type="application/json", status=status)
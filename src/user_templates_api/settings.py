@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 import json
 import os
+import tempfile
 from pathlib import Path
 
 from corsheaders.defaults import default_headers
@@ -94,6 +95,28 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# The user_templates cache holds render results and upstream lookups. The
+# default is shared by the workers on a host, set CACHE in the config to use
+# e.g. django.core.cache.backends.memcached.PyMemcacheCache or
+# django.core.cache.backends.redis.RedisCache across hosts.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "user_templates": CONFIG.get(
+        "CACHE",
+        {
+            "BACKEND": "user_templates_api.cache_backends.SizeLimitedFileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), "user_templates_api"),
+            "TIMEOUT": 300,
+            "OPTIONS": {"MAX_SIZE": 256 * 1024 * 1024},
+        },
+    ),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
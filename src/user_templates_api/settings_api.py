@@ -0,0 +1,32 @@
+"""
+API-only settings for user_templates_api.
+
+The API keeps no data in a database and authenticates requests with
+hubmap_commons' AuthHelper, so this profile drops the admin, auth, sessions
+and messages apps, their middleware and the database. Use it by setting
+DJANGO_SETTINGS_MODULE=user_templates_api.settings_api.
+"""
+
+from user_templates_api.settings import *  # noqa: F401,F403
+from user_templates_api.settings import TEMPLATES
+
+INSTALLED_APPS = [
+    "user_templates_api",
+    "corsheaders",
+]
+
+MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+# Templates are only rendered from strings with a plain dict as context.
+TEMPLATES = [{**TEMPLATES[0], "OPTIONS": {"context_processors": []}}]
+
+DATABASES = {}
+
+AUTH_PASSWORD_VALIDATORS = []
+
+USE_I18N = False
@@ -0,0 +1,246 @@
+"""
+Local stand-ins for the upstream services, for load testing the API offline.
+
+Set SIMULATION in the config to replace the Globus AuthHelper with
+SimulatedAuthHelper, and to serve the search API, portal, entity API and
+assets from a FakeUpstreamServer. The server takes a latency distribution and
+an error rate:
+
+    "SIMULATION": {
+      "UPSTREAMS": {"LATENCY_MS": {"MEDIAN": 40, "P99": 400}, "ERROR_RATE": 0.01},
+      "PORT": 8765,
+      "SEED": 0
+    }
+
+All the workers on a host use the server listening on PORT, so that their
+upstream URLs, and the cache keys that depend on them, are the same. Run it
+on its own with
+
+    python -m user_templates_api.simulation
+
+or the first worker to start will serve it.
+"""
+
+import errno
+import hashlib
+import logging
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hubmap_commons.hm_auth import AuthHelper
+
+from user_templates_api.serialization import DecodeError, dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+# The config keys of the upstream services a FakeUpstreamServer stands in for.
+UPSTREAM_CONFIG_KEYS = [
+    "PORTAL_UI_BASE",
+    "ENTITY_API_BASE",
+    "ELASTICSEARCH_ENDPOINT",
+    "UBKG_ENDPOINT",
+    "SOFT_ASSAY_ENDPOINT",
+    "ASSETS_ENDPOINT",
+]
+
+DEFAULT_PORT = 8765
+
+# z-score of the 99th percentile of the standard normal distribution.
+P99_Z_SCORE = 2.326
+
+
+class UpstreamProfile:
+    """
+    Latency and error rate of a simulated upstream. Latencies are log-normally
+    distributed with the given median and 99th percentile.
+    """
+
+    def __init__(self, median_ms=0, p99_ms=None, error_rate=0, seed=None):
+        self.median_ms = median_ms
+        p99_ms = median_ms if p99_ms is None else max(p99_ms, median_ms)
+        self.sigma = math.log(p99_ms / median_ms) / P99_Z_SCORE if median_ms > 0 else 0
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config, seed=None):
+        latency = config.get("LATENCY_MS", {})
+        return cls(
+            median_ms=latency.get("MEDIAN", 0),
+            p99_ms=latency.get("P99"),
+            error_rate=config.get("ERROR_RATE", 0),
+            seed=seed,
+        )
+
+    def sample_latency(self):
+        if self.median_ms <= 0:
+            return 0
+        return self.random.lognormvariate(math.log(self.median_ms), self.sigma) / 1e3
+
+    def respond(self):
+        """
+        Wait for a sampled latency, and return whether the call should fail.
+        """
+        time.sleep(self.sample_latency())
+        return self.random.random() < self.error_rate
+
+
+class SimulatedAuthHelper:
+    """
+    Stands in for the Globus AuthHelper, which needs Globus credentials to be
+    created. Requests only have their tokens read from the headers, which
+    makes no call to Globus, so no latency or errors are simulated.
+    """
+
+    def getAuthorizationTokens(self, requestHeaders):
+        # AuthHelper only parses the headers here, without using its state.
+        return AuthHelper.getAuthorizationTokens(self, requestHeaders)
+
+
+def fake_uuid(hubmap_id):
+    return hashlib.md5(hubmap_id.upper().encode()).hexdigest()
+
+
+def fake_files(uuid):
+    # Half of the datasets have an AnnData zarr store.
+    if int(uuid[-1], 16) % 2:
+        return [{"rel_path": "raw_expr.h5ad"}]
+    return [
+        {"rel_path": "hubmap_ui/anndata-zarr/secondary_analysis.zarr/.zgroup"},
+        {"rel_path": "hubmap_ui/anndata-zarr/secondary_analysis.zarr/X/.zarray"},
+        {"rel_path": "raw_expr.h5ad"},
+    ]
+
+
+def search_hits(query):
+    """
+    Answer the queries SearchApiClient makes with made-up documents.
+    """
+    query_clause = query.get("query", {})
+    if "ids" in query_clause:
+        return [
+            {"_id": uuid, "_source": {"uuid": uuid, "files": fake_files(uuid)}}
+            for uuid in query_clause["ids"].get("values", [])
+        ]
+    if "terms" in query_clause:
+        return [
+            {
+                "_id": fake_uuid(hubmap_id),
+                "_source": {"uuid": fake_uuid(hubmap_id), "hubmap_id": hubmap_id},
+            }
+            for hubmap_id in query_clause["terms"].get("hubmap_id", [])
+        ]
+    return []
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.handle_request(lambda: {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        def respond():
+            return {"hits": {"hits": search_hits(loads(body) if body else {})}}
+
+        self.handle_request(respond)
+
+    def handle_request(self, respond):
+        if self.server.profile.respond():
+            self.send_json(503, {"error": "Simulated upstream failure"})
+            return
+        try:
+            self.send_json(200, respond())
+        except (DecodeError, AttributeError):
+            self.send_json(400, {"error": "Invalid query"})
+
+    def send_json(self, status, data):
+        content = dumps_bytes(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    """
+    HTTP server standing in for the search API and the other upstream
+    services, answering after a latency sampled from profile.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, profile, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeUpstreamHandler)
+        self.profile = profile
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(
+            target=self.serve_forever, name="fake-upstream", daemon=True
+        ).start()
+
+
+def create_server(simulation):
+    return FakeUpstreamServer(
+        UpstreamProfile.from_config(
+            simulation.get("UPSTREAMS", {}), simulation.get("SEED")
+        ),
+        port=simulation.get("PORT", DEFAULT_PORT),
+    )
+
+
+def setup_simulation(config):
+    """
+    Point the upstream URLs in config at the FakeUpstreamServer of the host,
+    starting it unless another process already has, and return a
+    SimulatedAuthHelper.
+    """
+    simulation = config["SIMULATION"]
+    url = f"http://127.0.0.1:{simulation.get('PORT', DEFAULT_PORT)}"
+    try:
+        create_server(simulation).start()
+        logger.warning(f"Simulating upstream services at {url}")
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        logger.warning(f"Using the simulated upstream services at {url}")
+    for key in UPSTREAM_CONFIG_KEYS:
+        config[key] = url
+
+    return SimulatedAuthHelper()
+
+
+def main():
+    """
+    Serve the simulated upstream services of the config until interrupted.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "user_templates_api.settings")
+    from django.conf import settings
+
+    simulation = settings.CONFIG.get("SIMULATION")
+    if not simulation:
+        raise SystemExit("SIMULATION is not set in the config")
+    server = create_server(simulation)
+    print(f"Simulating upstream services at {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
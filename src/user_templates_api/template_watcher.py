@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateWatcher:
+    """
+    Watches the template directories and reloads a template in the catalog
+    whenever one of its files changes.
+
+    Uses inotify if inotify_simple is installed, and otherwise polls the
+    modification times of the template files.
+    """
+
+    def __init__(self, catalog, debounce_ms=200, poll_interval=2):
+        self.catalog = catalog
+        self.debounce_ms = debounce_ms
+        self.poll_interval = poll_interval
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run, name="template-watcher", daemon=True
+        )
+        self.thread.start()
+
+    def run(self):
+        if INotify is None:
+            logger.warning("inotify_simple is not installed, polling for changes")
+            self.watch_polling()
+        else:
+            self.watch_inotify()
+
+    def reload(self, changed):
+        for template_type, template_name in sorted(changed):
+            logger.info(f"Reloading template {template_type}/{template_name}")
+            try:
+                self.catalog.reload_template(template_type, template_name)
+            except Exception as e:
+                logger.error(f"Failed to reload {template_type}/{template_name}: {e!r}")
+
+    @staticmethod
+    def is_ignored(name):
+        return name.startswith("__") or name.startswith(".")
+
+    def watch_inotify(self):
+        inotify = INotify()
+        dir_mask = flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+        file_mask = dir_mask | flags.CLOSE_WRITE | flags.DELETE_SELF
+        # Maps watch descriptors to (template_type, template_name), where the
+        # template_name is None for the directory holding a type's templates.
+        watches = {}
+
+        def add_template_watch(template_type, template_dir):
+            if template_dir.is_dir() and not self.is_ignored(template_dir.name):
+                wd = inotify.add_watch(template_dir, file_mask)
+                watches[wd] = (template_type, template_dir.name)
+
+        for template_type in self.catalog.get_template_types():
+            template_type_dir = self.catalog.get_template_type_dir(template_type)
+            watches[inotify.add_watch(template_type_dir, dir_mask)] = (
+                template_type,
+                None,
+            )
+            for template_dir in template_type_dir.iterdir():
+                add_template_watch(template_type, template_dir)
+
+        while True:
+            changed = set()
+            for event in inotify.read(read_delay=self.debounce_ms):
+                if event.wd not in watches:
+                    continue
+                if event.mask & flags.IGNORED:
+                    watches.pop(event.wd)
+                    continue
+
+                template_type, template_name = watches[event.wd]
+                if template_name is None:
+                    if self.is_ignored(event.name):
+                        continue
+                    template_name = event.name
+                    if event.mask & (flags.CREATE | flags.MOVED_TO):
+                        add_template_watch(
+                            template_type,
+                            self.catalog.get_template_type_dir(template_type)
+                            / template_name,
+                        )
+                elif self.is_ignored(event.name):
+                    continue
+                changed.add((template_type, template_name))
+
+            self.reload(changed)
+
+    def get_modification_times(self):
+        modification_times = {}
+        for template_type in self.catalog.get_template_types():
+            template_type_dir = self.catalog.get_template_type_dir(template_type)
+            for template_dir in template_type_dir.iterdir():
+                if not template_dir.is_dir() or self.is_ignored(template_dir.name):
+                    continue
+                modification_times[(template_type, template_dir.name)] = tuple(
+                    sorted(
+                        (path.name, path.stat().st_mtime_ns)
+                        for path in template_dir.iterdir()
+                        if path.is_file()
+                    )
+                )
+        return modification_times
+
+    def watch_polling(self):
+        modification_times = self.get_modification_times()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                new_modification_times = self.get_modification_times()
+            except OSError:
+                # A directory was removed while it was being listed.
+                continue
+
+            changed = {
+                template
+                for template in modification_times.keys()
+                | new_modification_times.keys()
+                if modification_times.get(template)
+                != new_modification_times.get(template)
+            }
+            modification_times = new_modification_times
+            self.reload(changed)
@@ -0,0 +1,200 @@
+import hashlib
+import re
+from pathlib import Path
+
+from django.template import engines
+from django.template.base import Lexer, TokenType
+
+from user_templates_api.serialization import DecodeError, dumps, loads
+from user_templates_api.templates.jupyter_lab.utils.convert_templates.convert_notebook import (
+    conversion,
+)
+from user_templates_api.templatetags.jupyter_lab import TAG_CONTEXT
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_]\w*")
+STRING_LITERAL_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+
+class Fragment:
+    """
+    A piece of a template, compiled once and shared by every template that
+    contains the same text.
+
+    Fragments without template syntax are returned as they are. The custom
+    tags cache their own output, so the upstream lookups behind them are
+    reused across templates without caching whole renders.
+    """
+
+    def __init__(self, template_string):
+        self.template_string = template_string
+        self.digest = hashlib.sha256(template_string.encode()).hexdigest()
+        self.tags, self.variables = self.analyze(template_string)
+        self.template = (
+            engines["django"].from_string(template_string)
+            if self.tags or self.variables
+            else None
+        )
+
+    @staticmethod
+    def analyze(template_string):
+        """
+        Return the names of the tags and the identifiers used in the template.
+        Identifiers include filter and loop variable names, so this is a
+        superset of the context variables the template reads.
+        """
+        tags = set()
+        variables = set()
+        for token in Lexer(template_string).tokenize():
+            if token.token_type not in (TokenType.VAR, TokenType.BLOCK):
+                continue
+            contents = STRING_LITERAL_PATTERN.sub("", token.contents)
+            identifiers = IDENTIFIER_PATTERN.findall(contents)
+            if token.token_type == TokenType.BLOCK and identifiers:
+                tags.add(identifiers[0])
+                identifiers = identifiers[1:]
+            variables.update(identifiers)
+        return tags, variables
+
+    def render(self, context):
+        if self.template is None:
+            return self.template_string
+        # Django returns a SafeString, which orjson does not accept as a str.
+        return str.__str__(self.template.render(context))
+
+
+_fragments = {}
+
+
+def get_fragment(template_string):
+    digest = hashlib.sha256(template_string.encode()).hexdigest()
+    fragment = _fragments.get(digest)
+    if fragment is None:
+        fragment = _fragments.setdefault(digest, Fragment(template_string))
+    return fragment
+
+
+class CompiledTemplate:
+    """
+    A template compiled once from its file, along with the custom tags and
+    context variables it refers to.
+
+    A template that is a JSON list of cells without any tags is split into one
+    fragment per cell, serialized with sorted keys so that the boilerplate
+    cells many templates share are the same fragment. Any other template is a
+    single fragment, as a tag such as load applies to the rest of the template.
+    """
+
+    def __init__(self, template_string):
+        self.digest = hashlib.sha256(template_string.encode()).hexdigest()
+        self.fragments = None
+        if not Fragment.analyze(template_string)[0]:
+            try:
+                cells = loads(template_string)
+            except DecodeError:
+                cells = None
+            if isinstance(cells, list):
+                self.fragments = [
+                    get_fragment(dumps(cell, sort_keys=True)) for cell in cells
+                ]
+        if self.fragments is None:
+            self.fragment = get_fragment(template_string)
+            self.tags = self.fragment.tags
+            self.variables = self.fragment.variables
+        else:
+            self.fragment = None
+            self.tags = set().union(*(fragment.tags for fragment in self.fragments))
+            self.variables = set().union(
+                *(fragment.variables for fragment in self.fragments)
+            )
+            # Cells are identified by their content in the template, so an id
+            # stays the same when other cells are added or removed.
+            self.cell_ids = get_cell_ids(fragment.digest for fragment in self.fragments)
+
+    def uses(self, name):
+        """
+        Whether rendering the template needs the context variable name, either
+        directly or through one of its tags.
+        """
+        return name in self.variables or any(
+            name in TAG_CONTEXT.get(tag, ()) for tag in self.tags
+        )
+
+    def render(self, context):
+        if self.fragment is not None:
+            return self.fragment.render(context)
+        return (
+            "["
+            + ",".join(fragment.render(context) for fragment in self.fragments)
+            + "]"
+        )
+
+    def render_cells(self, context, skip_static=False):
+        """
+        Render the template to a list of (cell_id, cell, cell_hash), where
+        cell is the JSON of the cell. With skip_static, cell is None for the
+        cells without template syntax, which render the same every time.
+
+        Templates that are a single fragment are rendered whole, and their
+        cells are identified by their rendered content, as the number of cells
+        their tags render depends on the uuids. A cell of those templates that
+        changes is removed and added under a new id.
+        """
+        if self.fragment is not None:
+            rendered_template = self.fragment.render(context).strip()
+            cells = [
+                dumps(cell, sort_keys=True)
+                for cell in (loads(rendered_template) if rendered_template else [])
+            ]
+            cell_hashes = [hash_cell(cell) for cell in cells]
+            return list(zip(get_cell_ids(cell_hashes), cells, cell_hashes))
+
+        rendered_cells = []
+        for cell_id, fragment in zip(self.cell_ids, self.fragments):
+            if fragment.template is None:
+                cell = None if skip_static else fragment.template_string
+                rendered_cells.append((cell_id, cell, fragment.digest[:16]))
+            else:
+                cell = fragment.render(context)
+                rendered_cells.append((cell_id, cell, hash_cell(cell)))
+        return rendered_cells
+
+
+def get_cell_ids(digests):
+    """
+    Ids for cells with the given digests, with a suffix for repeated cells.
+
+    >>> get_cell_ids(['ab' * 16, 'cd' * 16, 'ab' * 16])
+    ['abababababababab', 'cdcdcdcdcdcdcdcd', 'abababababababab-2']
+    """
+    cell_ids = []
+    occurrences = {}
+    for digest in digests:
+        cell_id = digest[:16]
+        occurrences[cell_id] = occurrences.get(cell_id, 0) + 1
+        if occurrences[cell_id] > 1:
+            cell_id = f"{cell_id}-{occurrences[cell_id]}"
+        cell_ids.append(cell_id)
+    return cell_ids
+
+
+def hash_cell(cell):
+    return hashlib.sha256(cell.encode()).hexdigest()[:16]
+
+
+_compiled_templates = {}
+
+
+def get_compiled_template(template_file_path):
+    template_file_path = Path(template_file_path)
+    compiled_template = _compiled_templates.get(template_file_path)
+    if compiled_template is None:
+        with open(template_file_path) as template_file:
+            compiled_template = CompiledTemplate(conversion(template_file.read()))
+        _compiled_templates[template_file_path] = compiled_template
+    return compiled_template
+
+
+def invalidate_compiled_templates(template_dir):
+    for template_file_path in list(_compiled_templates):
+        if template_file_path.resolve().parent == template_dir.resolve():
+            _compiled_templates.pop(template_file_path, None)
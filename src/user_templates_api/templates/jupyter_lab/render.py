@@ -1,15 +1,21 @@
+import hashlib
 import inspect
-import json
 from pathlib import Path
 
-from django.template import engines
-
-from user_templates_api.templates.jupyter_lab.utils.convert_templates.convert_notebook import (
-    conversion,
+import user_templates_api.templates.jupyter_lab.utils.utils as jl_utils
+from user_templates_api.cache import get_cache, make_key
+from user_templates_api.request_parsing import RequestParseError, is_hubmap_id
+from user_templates_api.serialization import dumps, loads
+from user_templates_api.templates.jupyter_lab.compiled_templates import (
+    get_compiled_template,
 )
 
+# Render states are kept longer than other cache entries, as workspaces are
+# updated over days. The size limit of the cache still evicts them first if
+# they are not used.
+RENDER_STATE_TIMEOUT = 7 * 24 * 60 * 60
+
 # from nbformat.v4 import new_code_cell, new_markdown_cell
-# import user_templates_api.templates.jupyter_lab.utils.utils as jl_utils
 
 
 class JupyterLabRender:
@@ -24,22 +30,120 @@ class JupyterLabRender:
 
         nb = {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
 
-        return json.dumps(nb)
+        return dumps(nb)
 
-    def jinja_generate_template_data(self, data):
-        django_engine = engines["django"]
+    def normalize_uuids(self, uuids, group_token):
+        """
+        Lowercase and deduplicate the uuids and return them sorted, so that the
+        same set of datasets always renders the same notebook. HuBMAP IDs are
+        resolved to uuids with one batched lookup, and a RequestParseError is
+        raised if any of them do not exist.
+        """
+        uuids = [uuid.strip() for uuid in uuids]
+        hubmap_ids = sorted({uuid.upper() for uuid in uuids if is_hubmap_id(uuid)})
+        normalized_uuids = {uuid.lower() for uuid in uuids if not is_hubmap_id(uuid)}
+
+        if hubmap_ids:
+            try:
+                resolved_uuids = jl_utils.resolve_hubmap_ids(hubmap_ids, group_token)
+            except jl_utils.UnresolvedHubmapIdsError as e:
+                raise RequestParseError(str(e))
+            normalized_uuids.update(uuid.lower() for uuid in resolved_uuids)
+
+        return sorted(normalized_uuids)
 
+    def get_template_file_path(self):
         # Get the file path first
         class_file_path = inspect.getfile(self.__class__)
         # Convert the string to a pathlib Path
         class_file_path = Path(class_file_path)
-        # Grab the parent path and append template.txt
-        template_file_path = class_file_path.parent / "template.ipynb"
-        # Load that filepath since it should be the json template
-        template_file = open(template_file_path)
-        template = django_engine.from_string(conversion(template_file.read()))
-        rendered_template = template.render(data).strip()
-        rendered_template = json.loads(rendered_template) if rendered_template else {}
+        # Grab the parent path and append template.ipynb
+        return class_file_path.parent / "template.ipynb"
+
+    def build_context(self, compiled_template, data):
+        """
+        Build the render context, only resolving uuids and constructing the
+        util client if the template or one of its tags uses them.
+        """
+        context = dict(data)
+        if compiled_template.uses("uuids"):
+            context["uuids"] = self.normalize_uuids(
+                data["uuids"], data.get("group_token")
+            )
+        if compiled_template.uses("util_client"):
+            context["util_client"] = jl_utils.SearchApiClient(data.get("group_token"))
+        return context
+
+    def jinja_generate_template_data(self, data):
+        compiled_template = get_compiled_template(self.get_template_file_path())
+        context = self.build_context(compiled_template, data)
+        rendered_template = compiled_template.render(context).strip()
+        rendered_template = loads(rendered_template) if rendered_template else {}
 
         # Update this so that it returns actual JSON not text
         return rendered_template
+
+    def rerender(self, data, fingerprint=None):
+        """
+        Render the template and compare its cells to those of the render with
+        the given fingerprint. Returns the fingerprint of this render, the ids
+        of its cells in order and the cells that were added, changed or
+        removed. If the previous render is unknown, every cell is added.
+
+        Cells without template syntax are not rendered again if the template
+        did not change since the previous render.
+        """
+        metadata = data["metadata"]
+        data["uuids"] = data.get("uuids", [])
+
+        if metadata["template_format"] != "jinja":
+            return
+
+        compiled_template = get_compiled_template(self.get_template_file_path())
+        previous_state = get_cache().get(make_key("render_state", fingerprint))
+        if (
+            previous_state is None
+            or previous_state["template"] != compiled_template.digest
+        ):
+            previous_state = {"template": compiled_template.digest, "cells": []}
+            full = True
+        else:
+            full = False
+
+        context = self.build_context(compiled_template, data)
+        rendered_cells = compiled_template.render_cells(context, skip_static=not full)
+
+        state = {
+            "template": compiled_template.digest,
+            "cells": [[cell_id, cell_hash] for cell_id, _, cell_hash in rendered_cells],
+        }
+        new_fingerprint = hashlib.sha256(dumps(state).encode()).hexdigest()
+        get_cache().set(
+            make_key("render_state", new_fingerprint),
+            state,
+            timeout=RENDER_STATE_TIMEOUT,
+        )
+
+        previous_hashes = dict(previous_state["cells"])
+        cell_ids = [cell_id for cell_id, _, _ in rendered_cells]
+        current_cell_ids = set(cell_ids)
+        added = []
+        changed = []
+        for index, (cell_id, cell, cell_hash) in enumerate(rendered_cells):
+            if cell_id not in previous_hashes:
+                added.append({"id": cell_id, "index": index, "cell": loads(cell)})
+            elif previous_hashes[cell_id] != cell_hash:
+                changed.append({"id": cell_id, "index": index, "cell": loads(cell)})
+
+        return {
+            "fingerprint": new_fingerprint,
+            "full": full,
+            "cell_ids": cell_ids,
+            "added": added,
+            "changed": changed,
+            "removed": [
+                cell_id
+                for cell_id in previous_hashes
+                if cell_id not in current_cell_ids
+            ],
+        }
@@ -1,27 +1,194 @@
+import argparse
+import hashlib
 import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-from convert_notebook import notebook_to_text, text_to_notebook
+from convert_notebook import (
+    cells_to_notebook,
+    conversion,
+    get_template_path,
+    notebook_to_text,
+    text_to_notebook,
+)
 
-templates_folder = "src/user_templates_api/templates/jupyter_lab/templates"
+templates_folder = get_template_path()
+manifest_path = f"{os.path.dirname(os.path.abspath(__file__))}/.convert_manifest.json"
 
-templates = os.listdir(templates_folder)
-templates_jinja = []
 
-# retrieve templates that are jinja format
-for template in templates:
-    if not os.path.isdir(f"{templates_folder}/{template}"):
-        continue
-    with open(f"{templates_folder}/{template}/metadata.json", "r") as file:
-        metadata = json.load(file)
-        if (
-            metadata.get("template_format", "") == "jinja"
-            and metadata.get("is_hidden", "") is False
-        ):
-            templates_jinja.append(template)
+def get_jinja_templates():
+    """
+    Function returning the names of the templates that are jinja format and not hidden.
+    """
+    templates_jinja = []
 
+    for template in sorted(os.listdir(templates_folder)):
+        if not os.path.isdir(f"{templates_folder}/{template}"):
+            continue
+        with open(f"{templates_folder}/{template}/metadata.json", "r") as file:
+            metadata = json.load(file)
+            if (
+                metadata.get("template_format", "") == "jinja"
+                and metadata.get("is_hidden", "") is False
+            ):
+                templates_jinja.append(template)
 
-for template in templates_jinja:
-    print(template)
-    text_to_notebook(template)
-    notebook_to_text(template)
+    return templates_jinja
+
+
+def read_template_files(template):
+    """
+    Function returning the contents of the .txt and .ipynb files of a template.
+    A file that does not exist is returned as None.
+    """
+    contents = []
+    for extension in ["txt", "ipynb"]:
+        file_name = f"{templates_folder}/{template}/template.{extension}"
+        if os.path.exists(file_name):
+            with open(file_name, "r") as file:
+                contents.append(file.read())
+        else:
+            contents.append(None)
+    return contents
+
+
+def hash_template(template):
+    """
+    Function returning a hash of the .txt and .ipynb files of a template.
+    """
+    digest = hashlib.sha256()
+    for content in read_template_files(template):
+        digest.update(b"\0" if content is None else content.encode())
+    return digest.hexdigest()
+
+
+def convert_files(text_txt, text_ipynb):
+    """
+    Function returning the .txt and .ipynb texts of a template after conversion.
+    The .txt file is the source if it exists, and the .ipynb file otherwise, in
+    which case only the .ipynb text is returned.
+    """
+    if text_txt is None:
+        return None, cells_to_notebook(conversion(text_ipynb))
+    text_ipynb_new = cells_to_notebook(text_txt)
+    return conversion(text_ipynb_new), text_ipynb_new
+
+
+def convert_template(template):
+    """
+    Function that converts the .txt file of a template to a .ipynb file, and back.
+    Templates without a .txt file have their .ipynb file normalized in place.
+
+    Return
+    ---------
+    tuple
+        name of the template and the hash of its files after conversion
+    """
+    text_txt, text_ipynb = read_template_files(template)
+    if text_txt is not None:
+        text_to_notebook(template)
+        notebook_to_text(template)
+    else:
+        _, text_ipynb_new = convert_files(text_txt, text_ipynb)
+        if text_ipynb_new != text_ipynb:
+            with open(f"{templates_folder}/{template}/template.ipynb", "w") as file:
+                file.write(text_ipynb_new)
+    return template, hash_template(template)
+
+
+def check_template(template):
+    """
+    Function that checks whether converting a template would change its files,
+    without writing anything.
+
+    Return
+    ---------
+    tuple
+        name of the template and a list of the files that would change
+    """
+    text_txt, text_ipynb = read_template_files(template)
+    text_txt_new, text_ipynb_new = convert_files(text_txt, text_ipynb)
+
+    drifted = []
+    if text_ipynb_new != text_ipynb:
+        drifted.append("template.ipynb")
+    if text_txt_new != text_txt:
+        drifted.append("template.txt")
+    return template, drifted
+
+
+def load_manifest():
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as file:
+        return json.load(file)
+
+
+def save_manifest(manifest):
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Convert the jinja templates between .txt and .ipynb."
+    )
+    parser.add_argument(
+        "templates",
+        nargs="*",
+        help="Names of the template folders to convert. Defaults to all jinja templates.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report templates whose files would change, without writing them.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert templates even if they are unchanged since the last run.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes. Defaults to the number of CPUs.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    templates = args.templates or get_jinja_templates()
+
+    if args.check:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(check_template, templates))
+
+        drifted = [(template, files) for template, files in results if files]
+        for template, files in drifted:
+            print(f"{template}: {', '.join(files)} out of date")
+        return 1 if drifted else 0
+
+    manifest = load_manifest()
+    if not args.force:
+        templates = [
+            template
+            for template in templates
+            if manifest.get(template) != hash_template(template)
+        ]
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for template, template_hash in executor.map(convert_template, templates):
+            print(template)
+            manifest[template] = template_hash
+
+    save_manifest(manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
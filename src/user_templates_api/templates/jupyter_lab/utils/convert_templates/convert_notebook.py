@@ -9,6 +9,37 @@ def get_template_path():
     return "./src/user_templates_api/templates/jupyter_lab/templates"
 
 
+def cells_to_notebook(text):
+    """
+    Function that wraps a text of the cells of a notebook into a notebook text.
+
+    Parameters
+    ----------
+    text : str
+        text that is structured as a txt of the cells of the notebook
+
+    Return
+    ---------
+    str
+        text that is structured as a ipynb notebook
+    """
+    text_ipynb = ["{\n", ' "cells": ', text]
+    text_ipynb.extend(
+        [
+            ",\n",
+            ' "metadata": {\n',
+            '  "language_info": {\n',
+            '   "name": "python"\n',
+            "  }\n",
+            " },\n",
+            ' "nbformat": 4,\n',
+            ' "nbformat_minor": 2\n',
+            "}",
+        ]
+    )
+    return "".join(text_ipynb)
+
+
 def text_to_notebook(file_folder):
     """
     Function that converts a .txt file into a .ipynb file.
@@ -23,33 +54,12 @@ def text_to_notebook(file_folder):
     file_name_ipynb = f"{file_name_txt.split('.txt')[0]}.ipynb"
 
     # read txt
-    text_txt = []
     with open(file_name_txt, "r") as file:
-        text_txt = [f for f in file.readlines()]
-
-    # append start and end to txt
-    text_ipynb = []
-    text_ipynb.append("{\n")
-    text_ipynb.append(' "cells": ')
-    for line in text_txt:
-        text_ipynb.append(f"{line}")
-
-    for line in [
-        ",\n",
-        ' "metadata": {\n',
-        '  "language_info": {\n',
-        '   "name": "python"\n',
-        "  }\n",
-        " },\n",
-        ' "nbformat": 4,\n',
-        ' "nbformat_minor": 2\n',
-        "}",
-    ]:
-        text_ipynb.append(line)
+        text_txt = file.read()
 
     # write as ipynb
     with open(file_name_ipynb, "w") as file:
-        file.writelines(text_ipynb)
+        file.write(cells_to_notebook(text_txt))
 
 
 def convert_json(js):
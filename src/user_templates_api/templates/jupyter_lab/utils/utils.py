@@ -1,10 +1,77 @@
-import json
 import re
 from pathlib import Path
 from string import Template
 
+import requests
 from django.conf import settings
 
+from user_templates_api.cache import get_or_compute, hash_token
+from user_templates_api.serialization import loads
+
+
+class SearchApiError(Exception):
+    """
+    Raised when a request to the search API fails or returns an unexpected
+    response.
+    """
+
+
+class UnresolvedHubmapIdsError(ValueError):
+    def __init__(self, hubmap_ids):
+        super().__init__(f"Could not resolve HuBMAP IDs: {', '.join(hubmap_ids)}")
+        self.hubmap_ids = hubmap_ids
+
+
+class SearchApiClient:
+    """
+    Client for the lookups the template tags make against the search API.
+    """
+
+    def __init__(self, group_token):
+        self.group_token = group_token
+        self.search_url = (
+            settings.CONFIG["ELASTICSEARCH_ENDPOINT"]
+            + settings.CONFIG["PORTAL_INDEX_PATH"]
+        )
+
+    def search(self, query):
+        # Results depend on what the token has access to, so it is part of the key.
+        return get_or_compute(
+            "search",
+            [self.search_url, query, hash_token(self.group_token)],
+            lambda: self.post_search(query),
+        )
+
+    def post_search(self, query):
+        try:
+            response = requests.post(
+                self.search_url,
+                json=query,
+                headers=(
+                    {"Authorization": f"Bearer {self.group_token}"}
+                    if self.group_token
+                    else {}
+                ),
+                timeout=30,
+            )
+            response.raise_for_status()
+            return response.json()["hits"]["hits"]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            raise SearchApiError(f"Search API request failed: {e!r}") from e
+
+    def get_files(self, uuids):
+        hits = self.search(
+            {
+                "size": len(uuids),
+                "query": {"ids": {"values": uuids}},
+                "_source": ["files"],
+            }
+        )
+        return {
+            hit["_id"]: [file["rel_path"] for file in hit["_source"].get("files", [])]
+            for hit in hits
+        }
+
 
 def get_metadata_cells(uuids, util_client):
     url_base = settings.CONFIG["PORTAL_UI_BASE"]
@@ -38,6 +105,29 @@ def get_uuid_cells(uuids, util_client):
     return _get_cells("uuids.txt", uuids=uuids)
 
 
+def resolve_hubmap_ids(hubmap_ids, group_token):
+    """
+    Resolve HuBMAP IDs (e.g. HBM622.JXWQ.554) to uuids with a single search
+    request. Raises an UnresolvedHubmapIdsError if any of the ids can not be
+    found.
+    """
+    hits = SearchApiClient(group_token).search(
+        {
+            "size": len(hubmap_ids),
+            "query": {"terms": {"hubmap_id": hubmap_ids}},
+            "_source": ["uuid", "hubmap_id"],
+        }
+    )
+    hubmap_ids_to_uuids = {
+        hit["_source"]["hubmap_id"]: hit["_source"]["uuid"] for hit in hits
+    }
+
+    missing_ids = set(hubmap_ids) - hubmap_ids_to_uuids.keys()
+    if missing_ids:
+        raise UnresolvedHubmapIdsError(sorted(missing_ids))
+    return [hubmap_ids_to_uuids[hubmap_id] for hubmap_id in hubmap_ids]
+
+
 def _limit_to_zarr_files(uuids_to_files):
     """
     >>> uuids_to_files = {'1234': ['asdf/.zarr/abc', 'asdf/.zarr/xyz', 'other']}
@@ -53,4 +143,4 @@ def _limit_to_zarr_files(uuids_to_files):
 def _get_cells(filename, **kwargs):
     template = Template((Path(__file__).parent / "notebook" / filename).read_text())
     filled = template.substitute(kwargs)
-    return json.loads(filled)["cells"]
+    return loads(filled)["cells"]
@@ -1,39 +1,54 @@
-import json
-
 from django import template
 
 import user_templates_api.templates.jupyter_lab.utils.utils as jl_utils
+from user_templates_api.cache import get_config_digest, get_or_compute, hash_token
+from user_templates_api.serialization import dumps
 
 register = template.Library()
 
+# Context variables read by each tag, so a render only builds what its template uses.
+TAG_CONTEXT = {
+    "jupyter_get_metadata_cells": {"uuids"},
+    "jupyter_get_file_cells": {"uuids"},
+    "jupyter_get_anndata_cells": {"uuids", "util_client"},
+}
+
+
+def get_cells_str(tag_name, context, get_cells):
+    """
+    The cells from get_cells as a JSON string without the enclosing brackets,
+    cached by the uuids and config, and by the token if the tag uses the util
+    client. Templates that use the same tag for the same datasets share it.
+    """
+    uuids = context["uuids"]
+    util_client = context.get("util_client")
+    token = (
+        util_client.group_token
+        if util_client is not None and "util_client" in TAG_CONTEXT[tag_name]
+        else None
+    )
+
+    return get_or_compute(
+        "cells",
+        [tag_name, uuids, get_config_digest(), hash_token(token)],
+        lambda: dumps(get_cells(uuids, util_client))[1:-1],
+    )
+
 
 @register.simple_tag(takes_context=True)
 def jupyter_get_metadata_cells(context):
-    uuids = context["uuids"]
-    util_client = context["util_client"]
-    cells = jl_utils.get_metadata_cells(uuids, util_client)
-    cells_str = json.dumps(cells)
-    cells_str = cells_str[1:-1]
-    return cells_str
+    return get_cells_str(
+        "jupyter_get_metadata_cells", context, jl_utils.get_metadata_cells
+    )
 
 
 @register.simple_tag(takes_context=True)
 def jupyter_get_file_cells(context):
-    uuids = context["uuids"]
-    util_client = context["util_client"]
-    cells = jl_utils.get_file_cells(uuids, util_client)
-    cells_str = json.dumps(cells)
-    cells_str = cells_str[1:-1]
-    return cells_str
+    return get_cells_str("jupyter_get_file_cells", context, jl_utils.get_file_cells)
 
 
 @register.simple_tag(takes_context=True)
 def jupyter_get_anndata_cells(context):
-    uuids = context["uuids"]
-    util_client = context["util_client"]
-    cells = jl_utils.get_anndata_cells(uuids, util_client)
-    if not cells:
-        return ""
-    cells_str = json.dumps(cells)
-    cells_str = cells_str[1:-1]
-    return cells_str
+    return get_cells_str(
+        "jupyter_get_anndata_cells", context, jl_utils.get_anndata_cells
+    )
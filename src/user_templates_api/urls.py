@@ -14,14 +14,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path
 
 from . import views
 
 urlpatterns = [
     path("", views.index),
-    path("admin/", admin.site.urls),
     path("template_types/", views.TemplateTypeView.as_view(), name="template_types"),
     path(
         "templates/<str:template_type>/",
@@ -33,6 +32,16 @@ urlpatterns = [
         views.TemplateView.as_view(),
         name="template",
     ),
+    path(
+        "templates/<str:template_type>/<str:template_name>/export/",
+        views.TemplateExportView.as_view(),
+        name="export_template",
+    ),
+    path(
+        "templates/<str:template_type>/<str:template_name>/rerender/",
+        views.TemplateRerenderView.as_view(),
+        name="rerender_template",
+    ),
     path(
         "test_templates/<str:template_type>/<str:template_format>/",
         views.TestTemplateView.as_view(),
@@ -40,4 +49,15 @@ urlpatterns = [
     ),
     path("status/", views.StatusView.as_view(), name="status"),
     path("tags/", views.TagsView.as_view(), name="tags"),
+    path(
+        "search/<str:template_type>/",
+        views.SearchView.as_view(),
+        name="search_templates",
+    ),
 ]
+
+# The admin is not installed in the API-only settings profile.
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
@@ -1,13 +1,28 @@
 import importlib
 import inspect
-import json
 from pathlib import Path
 
 from django.apps import apps
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views import View
 
+from user_templates_api.archives import ARCHIVE_WRITERS, stream_archive
+from user_templates_api.catalog import InvalidCursorError
+from user_templates_api.request_parsing import (
+    RequestParseError,
+    parse_listing_params,
+    parse_render_request,
+)
+from user_templates_api.serialization import (
+    dumps,
+    dumps_bytes,
+    json_response,
+    load,
+    serialized_json_response,
+)
+from user_templates_api.templates.jupyter_lab.utils.utils import SearchApiError
+
 
 def index(request):
     return HttpResponse("Welcome to the User Templates API.")
@@ -15,136 +30,285 @@ def index(request):
 
 class TemplateTypeView(View):
     def get(self, request):
-        return HttpResponse(
-            json.dumps(
-                {
-                    "success": True,
-                    "message": "Success",
-                    "data": settings.CONFIG["template_types"],
-                }
-            )
+        return json_response(
+            {
+                "success": True,
+                "message": "Success",
+                "data": settings.CONFIG["template_types"],
+            }
         )
 
 
 class TemplateView(View):
     def get(self, request, template_type, template_name=""):
         response = {}
-        templates_dir = settings.BASE_DIR / "user_templates_api" / "templates"
+        catalog = apps.get_app_config("user_templates_api").catalog
 
         if not template_name:
             # TODO: Add support for checking is_multi_dataset_template field.
             query_tags = request.GET.getlist("tags", None)
 
-            for template_type_dir in (
-                templates_dir / template_type / "templates"
-            ).iterdir():
-                if not template_type_dir.is_dir() or "__" in str(template_type_dir):
-                    continue
-
-                template_metadata = json.load(open(template_type_dir / "metadata.json"))
-
-                template_tags = template_metadata["tags"]
+            try:
+                serialized_templates, next_cursor = catalog.list_templates(
+                    template_type,
+                    query_tags,
+                    **parse_listing_params(
+                        request.GET, catalog.get_field_names(template_type)
+                    ),
+                )
+            except (RequestParseError, InvalidCursorError) as e:
+                return json_response({"success": False, "message": str(e)}, status=400)
 
-                if query_tags and (set(template_tags) & set(query_tags)):
-                    response[template_type_dir.name] = template_metadata
-                elif not query_tags:
-                    response[template_type_dir.name] = template_metadata
+            # The templates are already serialized, so only the envelope is encoded here.
+            data = ",".join(
+                f"{dumps(name)}:{serialized_template}"
+                for name, serialized_template in serialized_templates.items()
+            )
+            next_cursor = f',"next_cursor":{dumps(next_cursor)}' if next_cursor else ""
+            return serialized_json_response(
+                f'{{"success":true,"message":"Success","data":{{{data}}}{next_cursor}}}'
+            )
         else:
             # This is meant to return an example template.
-            template_metadata = json.load(
-                open(
-                    templates_dir
-                    / template_type
-                    / "templates"
-                    / template_name
-                    / "metadata.json"
+            template_metadata = catalog.get_metadata(template_type, template_name)
+            if template_metadata is None:
+                return json_response(
+                    {"success": False, "message": "Template not found"},
+                    status=404,
                 )
-            )
 
             response[template_name] = {
                 "template_title": template_metadata["title"],
                 "description": template_metadata["description"],
             }
 
-        return HttpResponse(
-            json.dumps({"success": True, "message": "Success", "data": response})
-        )
+        return json_response({"success": True, "message": "Success", "data": response})
 
     def post(self, request, template_type, template_name=""):
         if not template_name:
-            return HttpResponse(
-                json.dumps({"success": False, "message": "Missing template_name"}),
+            return json_response(
+                {"success": False, "message": "Missing template_name"},
                 status=500,
             )
         else:
-            # Call utility functions for rendering that template. This is necessary as some templates
-            # might have their own python scripts to actually generate the script.
-            # Load the appropriate template module dynamically
-
-            template_module = importlib.import_module(
-                f"user_templates_api.templates.{template_type}.templates.{template_name}.render",
-                package=None,
+            metadata = apps.get_app_config("user_templates_api").catalog.get_metadata(
+                template_type, template_name
             )
+            if metadata is None:
+                return json_response(
+                    {"success": False, "message": "Template not found"},
+                    status=404,
+                )
 
-            # Call the render function to actually get the template
             try:
-                auth_helper = apps.get_app_config("user_templates_api").auth_helper
-
-                group_token = auth_helper.getAuthorizationTokens(request.headers)
-
-                if not isinstance(group_token, str):
-                    return HttpResponse(
-                        json.dumps({"success": False, "message": "Invalid token"}),
-                        status=401,
-                    )
-
-                data = {
-                    "group_token": group_token,
-                    "metadata": json.load(
-                        open(
-                            settings.BASE_DIR
-                            / "user_templates_api"
-                            / "templates"
-                            / template_type
-                            / "templates"
-                            / template_name
-                            / "metadata.json"
-                        )
-                    ),
-                }
+                rendered_template = render_template(
+                    request, template_type, template_name, metadata
+                )
 
-                data |= json.loads(request.body)
-
-                template_class_obj_inst = None
-                for template_class_name, template_class_obj in inspect.getmembers(
-                    template_module, inspect.isclass
-                ):
-                    if template_name in template_class_obj.__module__:
-                        template_class_obj_inst = template_class_obj()
-                        break
-
-                rendered_template = template_class_obj_inst.render(data)
-
-                return HttpResponse(
-                    json.dumps(
-                        {
-                            "success": True,
-                            "message": "Successful template render",
-                            "data": {"template": rendered_template},
-                        }
-                    )
+                return json_response(
+                    {
+                        "success": True,
+                        "message": "Successful template render",
+                        "data": {"template": rendered_template},
+                    }
                 )
             except Exception as e:
-                print(repr(e))
-                return HttpResponse(
-                    json.dumps(
-                        {
-                            "success": False,
-                            "message": "Failure when attempting to render template.",
-                        }
-                    ),
-                    status=500,
-                )
+                return render_error_response(e)
+
+
+def prepare_render(request, template_type, template_name, metadata):
+    """
+    Authenticate and parse a render request, and return the render class
+    instance of the template with the data to render it with. Raises a
+    RequestParseError for requests that can not be rendered.
+    """
+    # Call utility functions for rendering that template. This is necessary as some templates
+    # might have their own python scripts to actually generate the script.
+    # Load the appropriate template module dynamically
+
+    template_module = importlib.import_module(
+        f"user_templates_api.templates.{template_type}.templates.{template_name}.render",
+        package=None,
+    )
+
+    auth_helper = apps.get_app_config("user_templates_api").auth_helper
+
+    group_token = auth_helper.getAuthorizationTokens(request.headers)
+
+    if not isinstance(group_token, str):
+        raise RequestParseError("Invalid token", status=401)
+
+    body = parse_render_request(request, metadata)
+
+    data = {"group_token": group_token, "metadata": metadata}
+    data |= body
+
+    template_class_obj_inst = None
+    for template_class_name, template_class_obj in inspect.getmembers(
+        template_module, inspect.isclass
+    ):
+        if template_name in template_class_obj.__module__:
+            template_class_obj_inst = template_class_obj()
+            break
+
+    return template_class_obj_inst, data
+
+
+def render_template(request, template_type, template_name, metadata):
+    template_class_obj_inst, data = prepare_render(
+        request, template_type, template_name, metadata
+    )
+    return template_class_obj_inst.render(data)
+
+
+def render_error_response(e):
+    """
+    Error response for an exception raised while rendering a template.
+    """
+    if isinstance(e, RequestParseError):
+        return json_response({"success": False, "message": e.message}, status=e.status)
+    print(repr(e))
+    if isinstance(e, SearchApiError):
+        return json_response(
+            {"success": False, "message": "Search API request failed."},
+            status=502,
+        )
+    return json_response(
+        {"success": False, "message": "Failure when attempting to render template."},
+        status=500,
+    )
+
+
+def get_resource_options(metadata):
+    """
+    Combine the resource options of the examples of a template, taking the
+    largest value of numeric options.
+    """
+    resource_options = {}
+    for example in metadata.get("examples", []):
+        for name, value in example.get("resource_options", {}).items():
+            current = resource_options.setdefault(name, value)
+            if isinstance(value, (int, float)) and isinstance(current, (int, float)):
+                resource_options[name] = max(current, value)
+    return resource_options
+
+
+class TemplateExportView(View):
+    """
+    Renders a template like TemplateView.post, and streams it as an archive
+    along with the README of the template and a manifest of the resource
+    options its examples recommend for the workspace.
+    """
+
+    def post(self, request, template_type, template_name):
+        catalog = apps.get_app_config("user_templates_api").catalog
+        metadata = catalog.get_metadata(template_type, template_name)
+        if metadata is None:
+            return json_response(
+                {"success": False, "message": "Template not found"},
+                status=404,
+            )
+
+        archive_format = request.GET.get("format", "zip")
+        if archive_format not in ARCHIVE_WRITERS:
+            return json_response(
+                {
+                    "success": False,
+                    "message": "format must be one of " + ", ".join(ARCHIVE_WRITERS),
+                },
+                status=400,
+            )
+
+        # Render before streaming, so that failures still get an error status.
+        try:
+            rendered_template = render_template(
+                request, template_type, template_name, metadata
+            )
+        except Exception as e:
+            return render_error_response(e)
+        if rendered_template is None:
+            return json_response(
+                {
+                    "success": False,
+                    "message": "Template can not be exported.",
+                },
+                status=400,
+            )
+
+        manifest = {
+            "template_type": template_type,
+            "template_name": template_name,
+            "title": metadata.get("title", ""),
+            "resource_options": get_resource_options(metadata),
+            "examples": [
+                {
+                    "title": example.get("title", ""),
+                    "datasets": example.get("datasets", []),
+                    "resource_options": example.get("resource_options", {}),
+                }
+                for example in metadata.get("examples", [])
+            ],
+        }
+        members = [
+            (f"{template_name}/{template_name}.ipynb", rendered_template.encode()),
+            (f"{template_name}/resource_options.json", dumps_bytes(manifest)),
+        ]
+        readme_path = (
+            catalog.get_template_type_dir(template_type) / template_name / "README.md"
+        )
+        if readme_path.is_file():
+            members.append((f"{template_name}/README.md", readme_path))
+
+        writer_class = ARCHIVE_WRITERS[archive_format]
+        response = StreamingHttpResponse(
+            stream_archive(archive_format, members),
+            content_type=writer_class.content_type,
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="{template_name}.{writer_class.extension}"'
+        return response
+
+
+class TemplateRerenderView(View):
+    """
+    Renders a template like TemplateView.post, and returns only the cells
+    that differ from the render with the fingerprint given in the body.
+    """
+
+    def post(self, request, template_type, template_name):
+        metadata = apps.get_app_config("user_templates_api").catalog.get_metadata(
+            template_type, template_name
+        )
+        if metadata is None:
+            return json_response(
+                {"success": False, "message": "Template not found"},
+                status=404,
+            )
+
+        try:
+            template_class_obj_inst, data = prepare_render(
+                request, template_type, template_name, metadata
+            )
+            fingerprint = data.pop("fingerprint", None)
+            if fingerprint is not None and not isinstance(fingerprint, str):
+                raise RequestParseError("fingerprint must be a string")
+            if not hasattr(template_class_obj_inst, "rerender"):
+                raise RequestParseError("Template can not be re-rendered")
+
+            rendered_cells = template_class_obj_inst.rerender(data, fingerprint)
+            if rendered_cells is None:
+                raise RequestParseError("Template can not be re-rendered")
+
+            return json_response(
+                {
+                    "success": True,
+                    "message": "Successful template render",
+                    "data": rendered_cells,
+                }
+            )
+        except Exception as e:
+            return render_error_response(e)
 
 
 class TestTemplateView(View):
@@ -165,17 +329,23 @@ class TestTemplateView(View):
             group_token = auth_helper.getAuthorizationTokens(request.headers)
 
             if not isinstance(group_token, str):
-                return HttpResponse(
-                    json.dumps({"success": False, "message": "Invalid token"}),
+                return json_response(
+                    {"success": False, "message": "Invalid token"},
                     status=401,
                 )
 
-            data = {
-                "group_token": group_token,
-                "metadata": {"template_format": template_format},
-            }
+            metadata = {"template_format": template_format}
+
+            try:
+                body = parse_render_request(request, metadata)
+            except RequestParseError as e:
+                return json_response(
+                    {"success": False, "message": e.message},
+                    status=e.status,
+                )
 
-            data |= json.loads(request.body)
+            data = {"group_token": group_token, "metadata": metadata}
+            data |= body
 
             template_class_obj_inst = None
             for template_class_name, template_class_obj in inspect.getmembers(
@@ -187,26 +357,15 @@ class TestTemplateView(View):
 
             rendered_template = template_class_obj_inst.render(data)
 
-            return HttpResponse(
-                json.dumps(
-                    {
-                        "success": True,
-                        "message": "Successful template render",
-                        "data": {"template": rendered_template},
-                    }
-                )
+            return json_response(
+                {
+                    "success": True,
+                    "message": "Successful template render",
+                    "data": {"template": rendered_template},
+                }
             )
         except Exception as e:
-            print(repr(e))
-            return HttpResponse(
-                json.dumps(
-                    {
-                        "success": False,
-                        "message": "Failure when attempting to render template.",
-                    }
-                ),
-                status=500,
-            )
+            return render_error_response(e)
 
 
 class StatusView(View):
@@ -235,14 +394,63 @@ class StatusView(View):
             "build": build,
         }
 
-        return JsonResponse(response_data)
+        return json_response(response_data)
 
 
 class TagsView(View):
     def get(self, request):
         BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
-        tags = json.load(open(BASE_DIR / ("tags.json")))
-        return HttpResponse(
-            json.dumps({"success": True, "message": "Success", "data": tags})
+        tags = load(open(BASE_DIR / ("tags.json"), "rb"))
+        return json_response({"success": True, "message": "Success", "data": tags})
+
+
+class SearchView(View):
+    def get(self, request, template_type):
+        app_config = apps.get_app_config("user_templates_api")
+        query = request.GET.get("q", "").strip()
+        if not query:
+            return json_response(
+                {"success": False, "message": "Missing query parameter q"}, status=400
+            )
+
+        # Results are ranked by score and not paginated.
+        unsupported_params = [
+            param for param in ("sort", "cursor") if param in request.GET
+        ]
+        if unsupported_params:
+            return json_response(
+                {
+                    "success": False,
+                    "message": f"Search does not support {', '.join(unsupported_params)}",
+                },
+                status=400,
+            )
+
+        try:
+            listing_params = parse_listing_params(
+                request.GET, app_config.catalog.get_field_names(template_type)
+            )
+        except RequestParseError as e:
+            return json_response({"success": False, "message": e.message}, status=400)
+
+        fields = listing_params["fields"]
+        if fields is None:
+            fields = ("description", "tags", "title")
+        results = app_config.search_index.search(
+            template_type, query, listing_params["limit"] or 20
+        )
+        serialized_templates = app_config.catalog.get_serialized_templates(
+            template_type, fields
+        )
+
+        # The templates are already serialized, so only the envelope is encoded here.
+        data = ",".join(
+            f'{{"template_name":{dumps(name)},"score":{dumps(round(score, 4))},'
+            f'"metadata":{serialized_templates[name]}}}'
+            for name, score in results
+            if name in serialized_templates
+        )
+        return serialized_json_response(
+            f'{{"success":true,"message":"Success","data":[{data}]}}'
         )